@@ -1,10 +1,20 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 import numpy as np
 from pytools.result import Err, Ok, Result, all_ok
 from scipy.ndimage import gaussian_filter1d
 
-from ._types import Curve, Hold, PreppedData, Recover, SegmentType, Stretch
+from ._types import (
+    CompiledProtocol,
+    Curve,
+    Hold,
+    PrepBuffers,
+    PreppedData,
+    Recover,
+    SegmentType,
+    Stretch,
+)
+from .instrument import stage
 
 if TYPE_CHECKING:
     from collections.abc import Mapping, Sequence
@@ -12,23 +22,83 @@ if TYPE_CHECKING:
     from pytools.arrays import A1
 
 
-def prep_data[F: np.floating](x: A1[F]) -> PreppedData[F]:
+_DEFAULT_SIGMA = 20.0
+_MINIMUM_GRADIENT_SIZE = 2
+
+
+def _gradient_into[F: np.floating](f: A1[F], out: A1[F]) -> None:
+    # Same result as np.gradient(f), written into out without temporaries.
+    if len(f) < _MINIMUM_GRADIENT_SIZE:
+        msg = f"At least {_MINIMUM_GRADIENT_SIZE} samples are required, got {len(f)}."
+        raise ValueError(msg)
+    np.subtract(f[2:], f[:-2], out=out[1:-1])
+    out[1:-1] /= 2.0
+    out[0] = f[1] - f[0]
+    out[-1] = f[-1] - f[-2]
+
+
+def prep_data[F: np.floating](
+    x: A1[F], *, sigma: float = _DEFAULT_SIGMA, buffers: PrepBuffers[F] | None = None
+) -> PreppedData[F]:
     """Prepare raw data for segmentation.
 
     This function computes the smoothed data, first and second derivatives,
-    and normalizes the derivatives.
+    and normalizes the derivatives. Every step writes into the three output
+    arrays, so no other full length temporaries are allocated.
 
     Args:
         x: Raw input data.
+        sigma: Standard deviation of the Gaussian kernel in samples.
+        buffers: Optional preallocated outputs of the same length as x. These are
+            overwritten and referenced by the returned PreppedData.
 
     Returns:
         PreppedData containing the original data, smoothed data, and normalized derivatives.
 
+    Raises:
+        ValueError: If the buffers do not match the length of x, or x has fewer than 2 samples.
+
     """
-    y = gaussian_filter1d(x, sigma=20)
-    dy = np.gradient(y)
-    ddy = np.gradient(dy)
-    return PreppedData(n=len(x), x=x, y=y, dy=dy / dy.max(), ddy=ddy / ddy.max())
+    if buffers is not None and buffers.n != len(x):
+        msg = f"Buffer length {buffers.n} does not match data length {len(x)}."
+        raise ValueError(msg)
+    with stage("prep"):
+        if buffers is None:
+            buffers = PrepBuffers.empty(len(x), x.dtype)
+        gaussian_filter1d(x, sigma=sigma, output=buffers.y)
+        _gradient_into(buffers.y, buffers.dy)
+        _gradient_into(buffers.dy, buffers.ddy)
+        buffers.dy /= buffers.dy.max()
+        buffers.ddy /= buffers.ddy.max()
+    return PreppedData(n=len(x), x=x, y=buffers.y, dy=buffers.dy, ddy=buffers.ddy)
+
+
+class PrepEngine:
+    """Data preparation with a reusable set of output buffers.
+
+    The buffers only ever grow to the longest recording seen, and each call gets a
+    view of their first n samples, so batch loops do no repeated large allocations.
+    The PreppedData returned by `prep` is only valid until the next call; copy it if
+    it must outlive that call.
+    """
+
+    __slots__ = ("_buffers", "sigma")
+
+    def __init__(self, sigma: float = _DEFAULT_SIGMA) -> None:
+        self.sigma = sigma
+        self._buffers: PrepBuffers[Any] | None = None
+
+    def buffers[F: np.floating](self, n: int, dtype: np.dtype[F]) -> PrepBuffers[F]:
+        b = self._buffers
+        if b is None or b.n < n or b.y.dtype != dtype:
+            b = self._buffers = PrepBuffers.empty(n, dtype)
+        return PrepBuffers(y=b.y[:n], dy=b.dy[:n], ddy=b.ddy[:n])
+
+    def prep[F: np.floating](self, x: A1[F]) -> PreppedData[F]:
+        return prep_data(x, sigma=self.sigma, buffers=self.buffers(len(x), x.dtype))
+
+    def clear(self) -> None:
+        self._buffers = None
 
 
 def _parse_hold(data: Mapping[str, object]) -> Result[Hold]:
@@ -104,3 +174,34 @@ def curve_type(curve: SegmentType) -> Curve:
             return Curve.STRETCH
         case Recover():
             return Curve.RECOVER
+
+
+def compile_protocol(
+    data: Sequence[Mapping[str, object]] | Sequence[SegmentType] | CompiledProtocol,
+) -> Result[CompiledProtocol]:
+    """Compile a sequence of segments into a struct-of-arrays protocol.
+
+    Use CompiledProtocol.repeat and CompiledProtocol.concat to build long protocols
+    from short blocks without expanding them into Python lists.
+
+    Args:
+        data: Segment dictionaries or SegmentType instances, or an already compiled protocol.
+
+    Returns:
+        A CompiledProtocol with one entry per segment.
+
+    """
+    if isinstance(data, CompiledProtocol):
+        return Ok(data)
+    n = len(data)
+    curves = np.empty(n, dtype=np.int8)
+    rates = np.empty(n, dtype=np.float64)
+    durations = np.empty(n, dtype=np.float64)
+    for i, d in enumerate(data):
+        match parse_curve(d):
+            case Ok(curve):
+                curves[i] = curve_type(curve).code
+                rates[i], durations[i] = curve.rate, curve.duration
+            case Err(e):
+                return Err(e)
+    return Ok(CompiledProtocol(curves=curves, rates=rates, durations=durations))
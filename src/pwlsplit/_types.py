@@ -43,6 +43,15 @@ class Curve(enum.StrEnum):
     HOLD = "HOLD"
     RECOVER = "RECOVER"
 
+    @property
+    def code(self) -> int:
+        """Value of this curve in int8 code arrays."""
+        return _CURVE_CODES[self]
+
+    @classmethod
+    def from_code(cls, code: int) -> Curve:
+        return _CURVES[code]
+
 
 class Point(enum.StrEnum):
     START = "START"
@@ -50,6 +59,23 @@ class Point(enum.StrEnum):
     PEAK = "PEAK"
     VALLEY = "VALLEY"
 
+    @property
+    def code(self) -> int:
+        """Value of this point in int8 code arrays."""
+        return _POINT_CODES[self]
+
+    @classmethod
+    def from_code(cls, code: int) -> Point:
+        return _POINTS[code]
+
+
+# Codes are positions in declaration order. They are only stored in arrays, so they may be
+# renumbered freely, but must fit in an int8.
+_CURVES = tuple(Curve)
+_CURVE_CODES = {c: i for i, c in enumerate(_CURVES)}
+_POINTS = tuple(Point)
+_POINT_CODES = {p: i for i, p in enumerate(_POINTS)}
+
 
 @dc.dataclass(slots=True)
 class Hold:
@@ -83,6 +109,52 @@ class Recover:
 SegmentType = Hold | Stretch | Recover
 
 
+@dc.dataclass(slots=True, frozen=True)
+class CompiledProtocol:
+    """Struct-of-arrays representation of a protocol.
+
+    Attributes
+    ----------
+    curves : A1[np.int8]
+        Curve codes of the linear segments, see Curve.code.
+    rates : A1[np.float64]
+        Signed rate of each segment.
+    durations : A1[np.float64]
+        Duration of each segment.
+
+    """
+
+    curves: A1[np.int8]
+    rates: A1[np.float64]
+    durations: A1[np.float64]
+
+    def __len__(self) -> int:
+        return len(self.curves)
+
+    def repeat(self, n: int) -> CompiledProtocol:
+        """Repeat this block n times back to back."""
+        return CompiledProtocol(
+            curves=np.tile(self.curves, n),
+            rates=np.tile(self.rates, n),
+            durations=np.tile(self.durations, n),
+        )
+
+    @classmethod
+    def concat(cls, blocks: Sequence[CompiledProtocol]) -> CompiledProtocol:
+        """Join blocks in order into a single protocol."""
+        if len(blocks) == 0:
+            return cls(
+                curves=np.empty(0, dtype=np.int8),
+                rates=np.empty(0, dtype=np.float64),
+                durations=np.empty(0, dtype=np.float64),
+            )
+        return cls(
+            curves=np.concatenate([b.curves for b in blocks]),
+            rates=np.concatenate([b.rates for b in blocks]),
+            durations=np.concatenate([b.durations for b in blocks]),
+        )
+
+
 @dc.dataclass(slots=True)
 class PreppedData[F: np.floating]:
     """Input for segmentation."""
@@ -94,6 +166,29 @@ class PreppedData[F: np.floating]:
     ddy: A1[F]
 
 
+@dc.dataclass(slots=True)
+class PrepBuffers[F: np.floating]:
+    """Preallocated output arrays for data preparation.
+
+    Arrays are overwritten on every call that uses them, so any PreppedData built
+    from a buffer set is only valid until the buffer set is reused.
+    """
+
+    y: A1[F]
+    dy: A1[F]
+    ddy: A1[F]
+
+    @property
+    def n(self) -> int:
+        return len(self.y)
+
+    @classmethod
+    def empty(cls, n: int, dtype: type[F] | np.dtype[F]) -> PrepBuffers[F]:
+        return cls(
+            y=np.empty(n, dtype=dtype), dy=np.empty(n, dtype=dtype), ddy=np.empty(n, dtype=dtype)
+        )
+
+
 @dc.dataclass(slots=True)
 class Segmentation[F: np.floating, I: np.integer]:
     """Segmentation result.
@@ -104,10 +199,10 @@ class Segmentation[F: np.floating, I: np.integer]:
     ----------
     n_point : int
         Number of break points.
-    curves : Sequence[Curve]
-        List of curve types for linear segments. Len = n_point - 1
-    points : Sequence[Point]
-        List of type points at the ends of the segments. Len = n_point
+    curves : A1[np.int8]
+        Curve codes for linear segments, see Curve.code. Len = n_point - 1
+    points : A1[np.int8]
+        Point codes at the ends of the segments, see Point.code. Len = n_point
     idx : A1[I]
         Indices of the break points. Len = n_point
     peaks : A1[F]
@@ -116,7 +211,7 @@ class Segmentation[F: np.floating, I: np.integer]:
     """
 
     n_point: int
-    curves: Sequence[Curve]
-    points: Sequence[Point]
+    curves: A1[np.int8]
+    points: A1[np.int8]
     idx: A1[I]
     peaks: A1[F]
@@ -1,13 +1,16 @@
-from ._prep import curve_type, parse_curves, prep_data
+from ._prep import PrepEngine, compile_protocol, curve_type, parse_curves, prep_data
 from ._validation import is_segment_dict
-from .curve.peaks import construct_initial_segmentation
+from .curve.peaks import construct_initial_segmentation, estimate_peaks
 from .segment.refine import opt_index
 from .segment.split import adjust_segmentation
 
 __all__ = [
+    "PrepEngine",
     "adjust_segmentation",
+    "compile_protocol",
     "construct_initial_segmentation",
     "curve_type",
+    "estimate_peaks",
     "is_segment_dict",
     "opt_index",
     "parse_curves",
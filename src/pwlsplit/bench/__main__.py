@@ -0,0 +1,232 @@
+import argparse
+import json
+import platform
+import subprocess
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+from pytools.logging import get_logger
+from pytools.result import Err, Ok
+
+from pwlsplit.api import (
+    adjust_segmentation,
+    compile_protocol,
+    construct_initial_segmentation,
+    opt_index,
+    prep_data,
+)
+from pwlsplit.example import construct_bogoni_curves, create_bogoni_protocol
+from pwlsplit.instrument import Profile, recording
+from pwlsplit.synthetic import synthesize
+
+if TYPE_CHECKING:
+    from pytools.arrays import A1
+
+    from pwlsplit.synthetic import SyntheticData
+    from pwlsplit.types import CompiledProtocol
+
+parser = argparse.ArgumentParser(prog="pwlsplit.bench")
+parser.add_argument(
+    "--sizes",
+    type=float,
+    nargs="+",
+    default=[1e4, 1e5, 1e6, 1e7],
+    help="Number of samples of each benchmark signal.",
+)
+parser.add_argument(
+    "--cycle-samples",
+    type=int,
+    default=10_000,
+    help="Samples per bogoni cycle at which --noise applies.",
+)
+parser.add_argument(
+    "--max-cycles",
+    type=int,
+    default=1,
+    help="Most repeats of the bogoni cycle. Beyond that, cycles are stretched over more samples.",
+)
+parser.add_argument(
+    "--noise",
+    type=float,
+    default=0.002,
+    help="Standard deviation of the noise at --cycle-samples samples per cycle.",
+)
+parser.add_argument("--drift", type=float, default=0.0, help="Baseline drift over the signal.")
+parser.add_argument("--seed", type=int, default=0, help="Seed of the noise generator.")
+parser.add_argument("--window", type=int, default=50, help="Initial window of the refinement.")
+parser.add_argument("--max-iter", type=int, default=10, help="Maximum refinement sweeps.")
+parser.add_argument(
+    "--split-limit",
+    type=float,
+    default=None,
+    help="Skip the split and refinement for signals with more samples than this.",
+)
+parser.add_argument(
+    "--refine-limit",
+    type=float,
+    default=1e6,
+    help="Skip the refinement for signals with more samples than this.",
+)
+parser.add_argument("--no-memory", action="store_true", help="Do not trace peak allocations.")
+parser.add_argument(
+    "--out", type=str, default="pwlsplit_bench.json", help="Path of the JSON results."
+)
+
+
+def _commit() -> str | None:
+    try:
+        res = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        )
+    except OSError, subprocess.CalledProcessError:
+        return None
+    return res.stdout.strip()
+
+
+_MINIMUM_SCORED = 2
+
+
+def _breakpoint_error[I: np.integer](found: A1[I], truth: A1[np.intp]) -> dict[str, float] | None:
+    # Start and end points are pinned, only interior break points are scored.
+    m = min(len(found), len(truth)) - 1
+    if m < _MINIMUM_SCORED:
+        return None
+    err = np.abs(found[1:m].astype(np.intp) - truth[1:m])
+    return {"mean": float(err.mean()), "max": float(err.max())}
+
+
+_STAGES = ("prep", "split", "refine")
+
+
+def _skipped(n: int, args: argparse.Namespace) -> dict[str, str]:
+    if args.split_limit is not None and n > args.split_limit:
+        return {"split": "split-limit", "refine": "split-limit"}
+    if args.refine_limit is not None and n > args.refine_limit:
+        return {"refine": "refine-limit"}
+    return {}
+
+
+def _run_stages(
+    signal: SyntheticData,
+    protocol: CompiledProtocol,
+    args: argparse.Namespace,
+    profile: Profile,
+) -> Ok[dict[str, dict[str, float] | None]] | Err:
+    skipped = _skipped(len(signal.x), args)
+    errors: dict[str, dict[str, float] | None] = dict.fromkeys(_STAGES)
+    with recording(profile):
+        data = prep_data(signal.x)
+        if "split" in skipped:
+            return Ok(errors)
+        match construct_initial_segmentation(protocol):
+            case Ok(segmentation):
+                pass
+            case Err(e):
+                return Err(e)
+        match adjust_segmentation(data, segmentation, range(1, segmentation.n_point)):
+            case Ok(segmentation):
+                errors["split"] = _breakpoint_error(segmentation.idx, signal.breakpoints)
+            case Err(e):
+                return Err(e)
+        if "refine" not in skipped:
+            refined = opt_index(data.x, segmentation.idx, args.window, max_iter=args.max_iter)
+            errors["refine"] = _breakpoint_error(refined, signal.breakpoints)
+    return Ok(errors)
+
+
+def _stage_result(
+    timing: Profile, memory: Profile | None, name: str, n: int, error: dict[str, float] | None
+) -> dict[str, object] | None:
+    if (stats := timing.stages.get(name)) is None:
+        return None
+    peak = None if memory is None or name not in memory.stages else memory.stages[name].peak_bytes
+    return {
+        "wall_s": stats.wall_s,
+        "samples_per_s": n / stats.wall_s if stats.wall_s > 0 else None,
+        "peak_bytes": peak,
+        "breakpoint_error": error,
+    }
+
+
+def run_size(
+    signal: SyntheticData, protocol: CompiledProtocol, args: argparse.Namespace
+) -> dict[str, object]:
+    """Time each stage on signal, then trace its memory in a separate pass.
+
+    Tracing slows allocation down, so timings come from an untraced pass. A failing stage
+    is recorded in the result instead of aborting the remaining sizes, and a stage skipped
+    by a size limit is recorded with the name of that limit.
+    """
+    n = len(signal.x)
+    timing = Profile()
+    match _run_stages(signal, protocol, args, timing):
+        case Ok(errors):
+            pass
+        case Err(e):
+            return {"n": n, "segments": len(protocol), "error": str(e)}
+    memory = None
+    if not args.no_memory:
+        memory = Profile(memory=True)
+        _run_stages(signal, protocol, args, memory)
+    skipped = _skipped(n, args)
+    return {
+        "n": n,
+        "segments": len(protocol),
+        "stages": {
+            k: {"skipped": skipped[k]}
+            if k in skipped
+            else _stage_result(timing, memory, k, n, errors[k])
+            for k in _STAGES
+        },
+        "counters": dict(timing.counters),
+    }
+
+
+def main() -> None:
+    args = parser.parse_args()
+    log = get_logger(level="INFO")
+    match compile_protocol(construct_bogoni_curves(create_bogoni_protocol(0.3))[1]):
+        case Ok(cycle):
+            pass
+        case Err(e):
+            raise e
+    results: list[dict[str, object]] = []
+    for size in args.sizes:
+        n = int(size)
+        # Bounding the repeats keeps the number of segments, and so the split and refine cost
+        # per sample, fixed at large sizes. Stretched cycles have shallower slopes per sample,
+        # so the noise is scaled with them to keep the difficulty of the prepped derivatives.
+        cycles = min(max(round(n / args.cycle_samples), 1), args.max_cycles)
+        protocol = cycle.repeat(cycles)
+        noise = args.noise * args.cycle_samples * cycles / n
+        match synthesize(protocol, n=n, noise=noise, drift=args.drift, seed=args.seed):
+            case Ok(signal):
+                log.info(f"Benchmarking n = {n} over {cycles} cycle(s)")
+                result = run_size(signal, protocol, args)
+            case Err(e):
+                result = {"n": n, "segments": len(protocol), "error": str(e)}
+        if "error" in result:
+            log.info(f"Failed at n = {result['n']}: {result['error']}")
+        results.append(result)
+    report = {
+        "commit": _commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "results": results,
+    }
+    fout = Path(args.out)
+    with fout.open("w") as f:
+        json.dump(report, f, indent=2)
+    log.info(f"Results written to {fout}")
+
+
+if __name__ == "__main__":
+    main()
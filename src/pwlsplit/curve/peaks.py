@@ -1,80 +1,84 @@
-import itertools
-from typing import TYPE_CHECKING, Literal
+from typing import TYPE_CHECKING
 
 import numpy as np
 from pytools.result import Err, Ok
 
-from pwlsplit.api import curve_type, parse_curves
-from pwlsplit.types import Curve, Point, Segmentation, SegmentDict, SegmentType
-
-from ._types import Segment
+from pwlsplit.api import compile_protocol
+from pwlsplit.types import CompiledProtocol, Curve, Point, Segmentation, SegmentDict, SegmentType
 
 if TYPE_CHECKING:
-    from collections.abc import Mapping, Sequence
+    from collections.abc import Sequence
 
     from pytools.arrays import A1
 
 
-_BREAKPOINT_MAPPING: Mapping[tuple[Curve, Curve], Literal[Point.PEAK, Point.VALLEY] | None] = {
-    (Curve.HOLD, Curve.STRETCH): Point.PEAK,
-    (Curve.HOLD, Curve.RECOVER): Point.VALLEY,
-    (Curve.STRETCH, Curve.HOLD): Point.VALLEY,
-    (Curve.STRETCH, Curve.RECOVER): Point.VALLEY,
-    (Curve.RECOVER, Curve.HOLD): Point.PEAK,
-    (Curve.RECOVER, Curve.STRETCH): Point.PEAK,
+def _breakpoint_table() -> A1[np.int8]:
+    # Point code for each (left, right) curve pair, -1 marks an invalid pair.
+    table = np.full((len(Curve), len(Curve)), -1, dtype=np.int8)
+    table[Curve.HOLD.code, Curve.STRETCH.code] = Point.PEAK.code
+    table[Curve.HOLD.code, Curve.RECOVER.code] = Point.VALLEY.code
+    table[Curve.STRETCH.code, Curve.HOLD.code] = Point.VALLEY.code
+    table[Curve.STRETCH.code, Curve.RECOVER.code] = Point.VALLEY.code
+    table[Curve.RECOVER.code, Curve.HOLD.code] = Point.PEAK.code
+    table[Curve.RECOVER.code, Curve.STRETCH.code] = Point.PEAK.code
     # Other combinations are invalid
-}
+    return table
 
 
-def _estimate_peak(left: Segment, right: Segment) -> Ok[tuple[Point, float]] | Err:
-    match _BREAKPOINT_MAPPING.get((left.c, right.c), None):
-        case None:
-            msg = f"Invalid segment pair: {left}, {right}."
-            return Err(ValueError(msg))
-        case Point.PEAK as p:
-            return Ok((p, abs(right.r) + abs(left.r)))
-        case Point.VALLEY as p:
-            return Ok((p, -abs(right.r) - abs(left.r)))
+_BREAKPOINT_TABLE = _breakpoint_table()
 
 
 def estimate_peaks(
-    curves: Sequence[Segment],
-) -> Ok[tuple[Sequence[Point], A1[np.float64]]] | Err:
-    results = [_estimate_peak(left, right) for left, right in itertools.pairwise(curves)]
-    errors = [res for res in results if isinstance(res, Err)]
-    if len(errors) > 0:
-        msg = f"{len(errors)} errors occurred during peak estimation."
-        for e in errors:
-            msg += f"\n - {e.val}"
+    curves: A1[np.int8],
+    rates: A1[np.float64],
+) -> Ok[tuple[A1[np.int8], A1[np.float64]]] | Err:
+    """Estimate the point type and normalized peak height at every break point.
+
+    Args:
+        curves: Curve codes of the linear segments.
+        rates: Signed rates of the linear segments.
+
+    Returns:
+        Point codes and peak heights, both of length len(curves) + 1.
+
+    """
+    inner = _BREAKPOINT_TABLE[curves[:-1], curves[1:]]
+    invalid = np.flatnonzero(inner < 0)
+    if len(invalid) > 0:
+        msg = f"{len(invalid)} errors occurred during peak estimation."
+        for i in invalid:
+            left, right = Curve.from_code(curves[i]), Curve.from_code(curves[i + 1])
+            msg += f"\n - Invalid segment pair: {left}({rates[i]}), {right}({rates[i + 1]})."
         return Err(ValueError(msg))
-    segments = [res.val for res in results if isinstance(res, Ok)]
-    points = [Point.START, *[s[0] for s in segments], Point.END]
-    peaks = np.array([s[1] for s in segments], dtype=np.float64)
+    magnitude = np.abs(rates[:-1]) + np.abs(rates[1:])
+    peaks = np.where(inner == Point.PEAK.code, magnitude, -magnitude)
     if len(peaks):
-        peaks = peaks / peaks.max()
-    heights = np.array([1.0, *peaks, 1.0], dtype=np.float64)
+        peaks /= peaks.max()
+    points = np.concatenate(([Point.START.code], inner, [Point.END.code])).astype(np.int8)
+    heights = np.concatenate(([1.0], peaks, [1.0]))
     return Ok((points, heights))
 
 
 def construct_initial_segmentation(
-    data: Sequence[SegmentDict] | Sequence[SegmentType],
+    data: Sequence[SegmentDict] | Sequence[SegmentType] | CompiledProtocol,
 ) -> Ok[Segmentation[np.float64, np.intp]] | Err:
-    match parse_curves(data):
+    match compile_protocol(data):
         case Err(e):
             return Err(e)
-        case Ok(data):
+        case Ok(protocol):
             pass
-    curves = [curve_type(s) for s in data]
-    rate = [d.rate for d in data]
-    segments = [Segment(c=c, r=r) for c, r in zip(curves, rate, strict=True)]
-    initial_index = np.arange(len(segments), dtype=np.intp)
-    match estimate_peaks(segments):
+    match estimate_peaks(protocol.curves, protocol.rates):
         case Err(e):
             return Err(e)
         case Ok((points, peaks)):
             pass
+    initial_index = np.arange(len(points), dtype=np.intp)
     return Ok(
         Segmentation(
-            n_point=len(points), curves=curves, points=points, idx=initial_index, peaks=peaks
+            n_point=len(points),
+            curves=protocol.curves,
+            points=points,
+            idx=initial_index,
+            peaks=peaks,
         )
     )
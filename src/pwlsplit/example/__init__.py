@@ -0,0 +1,3 @@
+from ._tools import construct_bogoni_curves, create_bogoni_protocol
+
+__all__ = ["construct_bogoni_curves", "create_bogoni_protocol"]
@@ -1,89 +1,52 @@
 import argparse
+import functools
 import json
+import os
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
-import numpy as np
-import pandas as pd
 from pytools.logging import ILogger, get_logger
-from pytools.result import Err, Ok
 
-from pwlsplit.api import adjust_segmentation, construct_initial_segmentation, opt_index, prep_data
-from pwlsplit.plot import plot_prepped_data, plot_segmentation_part
-
-from ._tools import construct_bogoni_curves, create_bogoni_protocol
+from pwlsplit.instrument import Profile
+from pwlsplit.pipeline import Stage, run_pipeline
+from pwlsplit.plot import BackgroundPlotter
+
+from ._stages import (
+    BogoniTask,
+    attach_segmentation,
+    export_stage,
+    job_label,
+    load_stage,
+    plot_stage,
+    segment_payload,
+    segment_recording,
+)
 
 if TYPE_CHECKING:
-    from pytools.arrays import A2
-
-    from pwlsplit.types import Segmentation
-
-    from ._trait import CurveIndex
+    from collections.abc import Iterator
 
 parser = argparse.ArgumentParser(prog="pwlsplit")
 parser.add_argument("file", type=str, nargs="+", help="Path to the input file(s).")
 parser.add_argument("--plot", action="store_true", help="Generate plots for the segmented data.")
-
-
-def export_bogoni_data[F: np.floating, I: np.integer](
-    data: A2[F], segmentation: Segmentation[F, I], prot_map: CurveIndex, fout: Path
-) -> None:
-    protocol = np.full_like(data[:, 0], "", dtype="<U16")
-    cycle = np.full_like(data[:, 0], "", dtype="<U16")
-    phase = np.full_like(data[:, 0], "", dtype="<U16")
-    for prot, prot_vals in prot_map.items():
-        for cycle_name, segs in prot_vals.items():
-            for k, v in enumerate(segs):
-                protocol[segmentation.idx[v - 1] : segmentation.idx[v] + 1] = prot
-                cycle[segmentation.idx[v - 1] : segmentation.idx[v] + 1] = cycle_name
-                phase[segmentation.idx[v - 1] : segmentation.idx[v] + 1] = (
-                    f"{k}_{segmentation.curves[v - 1]}"
-                )
-    df = pd.DataFrame.from_dict(
-        {
-            "Protocol": protocol,
-            "Cycle": cycle,
-            "Phase": phase,
-            "Time [s]": data[:, 0],
-            "Stretch [-]": data[:, 1],
-            "P [kPa]": data[:, 2],
-            "Weight [-]": 1.0 / data[:, 3],
-        }
-    )
-    df.to_csv(fout, index=False)
-
-
-def bogoni_process(file: Path, fout: str, *, log: ILogger) -> None:
-    folder = file.parent
-    raw = np.loadtxt(file, delimiter=",", skiprows=1, dtype=np.float64)
-
-    data = prep_data(raw[:, 1])
-    plot_prepped_data(data, fout=(folder / f"{fout}_prepped.png"))
-    protocol = create_bogoni_protocol(0.3)
-    prot_map, curves = construct_bogoni_curves(protocol)
-    match construct_initial_segmentation(curves):
-        case Ok(segmentation):
-            log.debug("Initial segmentation constructed.")
-        case Err(e):
-            raise e
-    for prot, prot_vals in prot_map.items():
-        log.info(f"Working on Protocol: {prot}")
-        test_idx = sorted({v for cycle in prot_vals.values() for v in cycle})
-        match adjust_segmentation(data, segmentation, test_idx):
-            case Ok(segmentation):
-                log.debug(segmentation.idx)
-                fig_name = folder / f"{fout}_{prot}_segmentation.png"
-                plot_segmentation_part(data, segmentation, test_idx, fout=fig_name)
-            case Err(e):
-                raise e
-    segmentation.idx = opt_index(data.x, segmentation.idx, window=50, max_iter=100)
-    export_bogoni_data(raw, segmentation, prot_map, fout=(folder / f"{fout}.csv"))
-
-
-def main() -> None:
-    args = parser.parse_args()
-    files = [Path(v) for f in args.file for v in Path().glob(f)]
-    log = get_logger(level="INFO")
+parser.add_argument(
+    "--profile", action="store_true", help="Write a JSON stage profile for each recording."
+)
+parser.add_argument(
+    "--memory",
+    action="store_true",
+    help="Include peak allocations in the profiles. Implies --profile.",
+)
+parser.add_argument(
+    "--depth", type=int, default=2, help="Number of recordings queued before each stage."
+)
+parser.add_argument(
+    "--workers", type=int, default=None, help="Number of processes used for segmentation."
+)
+
+
+def _tasks(
+    files: list[Path], log: ILogger, *, plot: bool, profile: bool, memory: bool
+) -> Iterator[BogoniTask]:
     for file in files:
         with file.open("r") as f:
             specimen = json.load(f)
@@ -91,7 +54,49 @@ def main() -> None:
             for rate, name in tests.items():
                 fout = f"{axis}_{rate.replace('.', '-')}"
                 log.info(f"Processing file: {file} for axis: {axis} at rate: {rate}")
-                bogoni_process(file.parent / name, fout, log=log)
+                yield BogoniTask(
+                    file=file.parent / name,
+                    fout=fout,
+                    plot=plot,
+                    profile=Profile(memory=memory) if profile else None,
+                )
+
+
+def main() -> None:
+    args = parser.parse_args()
+    files = [Path(v) for f in args.file for v in Path().glob(f)]
+    log = get_logger(level="INFO")
+    workers = args.workers or os.cpu_count() or 1
+    plotter = BackgroundPlotter() if args.plot else None
+    stages: list[Stage[Any, Any]] = [
+        Stage("load", load_stage, depth=args.depth),
+        Stage(
+            "segment",
+            segment_recording,
+            kind="compute",
+            workers=workers,
+            depth=args.depth,
+            send=segment_payload,
+            receive=attach_segmentation,
+        ),
+    ]
+    if plotter is not None:
+        stages.append(
+            Stage("plot", functools.partial(plot_stage, plotter=plotter), depth=args.depth)
+        )
+    stages.append(Stage("export", export_stage, depth=args.depth))
+    try:
+        tasks = _tasks(
+            files, log, plot=args.plot, profile=args.profile or args.memory, memory=args.memory
+        )
+        results = run_pipeline(
+            tasks, stages, max_processes=args.workers, depth=args.depth, label=job_label
+        )
+        for fout in results:
+            log.info(f"Written: {fout}")
+    finally:
+        if plotter is not None:
+            plotter.close()
 
 
 if __name__ == "__main__":
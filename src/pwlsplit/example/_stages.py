@@ -0,0 +1,174 @@
+import dataclasses as dc
+import reprlib
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+from pytools.logging import get_logger
+from pytools.result import Err, Ok
+
+from pwlsplit.api import (
+    PrepEngine,
+    adjust_segmentation,
+    construct_initial_segmentation,
+    opt_index,
+)
+from pwlsplit.instrument import recording, stage
+from pwlsplit.plot import prepare_prepped_data, prepare_segmentation_part
+from pwlsplit.types import Curve
+
+from ._tools import construct_bogoni_curves, create_bogoni_protocol
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytools.arrays import A1, A2
+
+    from pwlsplit.instrument import Profile
+    from pwlsplit.plot import BackgroundPlotter, PlotJob
+    from pwlsplit.types import Segmentation
+
+    from ._trait import CurveIndex
+
+
+@dc.dataclass(slots=True, frozen=True)
+class BogoniTask:
+    file: Path
+    fout: str
+    plot: bool = False
+    profile: Profile | None = None
+
+
+@dc.dataclass(slots=True, frozen=True)
+class Loaded:
+    task: BogoniTask
+    raw: A2[np.float64]
+
+
+@dc.dataclass(slots=True, frozen=True)
+class SegmentResult:
+    """Everything the segmentation worker sends back for one recording.
+
+    Only break point arrays and decimated plot curves, so returning it is cheap. `plots`
+    maps the figure name suffix to its prepared plot.
+    """
+
+    segmentation: Segmentation[np.float64, np.intp]
+    prot_map: CurveIndex
+    plots: dict[str, PlotJob]
+    profile: Profile | None
+
+
+@dc.dataclass(slots=True, frozen=True)
+class Segmented:
+    task: BogoniTask
+    raw: A2[np.float64]
+    result: SegmentResult
+
+
+# Buffers are reused across the recordings handled by the same process. The prepped
+# data never leaves segment_recording, so reuse is safe.
+_ENGINE = PrepEngine()
+
+
+def job_label(job: object) -> str:
+    match job:
+        case BogoniTask(file=file):
+            return str(file)
+        case Loaded(task=task) | Segmented(task=task):
+            return str(task.file)
+        case _:
+            return reprlib.repr(job)
+
+
+def load_stage(task: BogoniTask) -> Loaded:
+    with recording(task.profile), stage("load"):
+        raw = np.loadtxt(task.file, delimiter=",", skiprows=1, dtype=np.float64)
+    return Loaded(task=task, raw=raw)
+
+
+def segment_payload(job: Loaded) -> tuple[BogoniTask, A1[np.float64]]:
+    return job.task, job.raw[:, 1]
+
+
+def segment_recording(payload: tuple[BogoniTask, A1[np.float64]]) -> SegmentResult:
+    """Prepare, split and refine one recording, keeping the prepped data in this process."""
+    task, x = payload
+    log = get_logger()
+    with recording(task.profile):
+        data = _ENGINE.prep(x)
+        protocol = create_bogoni_protocol(0.3)
+        prot_map, curves = construct_bogoni_curves(protocol)
+        match construct_initial_segmentation(curves):
+            case Ok(segmentation):
+                log.debug("Initial segmentation constructed.")
+            case Err(e):
+                raise e
+        plots: dict[str, PlotJob] = {}
+        if task.plot:
+            plots["prepped"] = prepare_prepped_data(data)
+        for prot, prot_vals in prot_map.items():
+            log.info(f"Working on Protocol: {prot}")
+            test_idx = sorted({v for cycle in prot_vals.values() for v in cycle})
+            match adjust_segmentation(data, segmentation, test_idx):
+                case Ok(segmentation):
+                    log.debug(segmentation.idx)
+                    if task.plot:
+                        plots[f"{prot}_segmentation"] = prepare_segmentation_part(
+                            data, segmentation, test_idx
+                        )
+                case Err(e):
+                    raise e
+        segmentation.idx = opt_index(data.x, segmentation.idx, window=50, max_iter=100)
+    return SegmentResult(
+        segmentation=segmentation, prot_map=prot_map, plots=plots, profile=task.profile
+    )
+
+
+def attach_segmentation(job: Loaded, result: SegmentResult) -> Segmented:
+    task = dc.replace(job.task, profile=result.profile)
+    return Segmented(task=task, raw=job.raw, result=result)
+
+
+def plot_stage(job: Segmented, *, plotter: BackgroundPlotter) -> Segmented:
+    folder, fout = job.task.file.parent, job.task.fout
+    for name, plot in job.result.plots.items():
+        plotter.submit(plot, folder / f"{fout}_{name}.png")
+    return job
+
+
+def export_bogoni_data[F: np.floating, I: np.integer](
+    data: A2[F], segmentation: Segmentation[F, I], prot_map: CurveIndex, fout: Path
+) -> None:
+    protocol = np.full_like(data[:, 0], "", dtype="<U16")
+    cycle = np.full_like(data[:, 0], "", dtype="<U16")
+    phase = np.full_like(data[:, 0], "", dtype="<U16")
+    for prot, prot_vals in prot_map.items():
+        for cycle_name, segs in prot_vals.items():
+            for k, v in enumerate(segs):
+                protocol[segmentation.idx[v - 1] : segmentation.idx[v] + 1] = prot
+                cycle[segmentation.idx[v - 1] : segmentation.idx[v] + 1] = cycle_name
+                phase[segmentation.idx[v - 1] : segmentation.idx[v] + 1] = (
+                    f"{k}_{Curve.from_code(segmentation.curves[v - 1])}"
+                )
+    df = pd.DataFrame.from_dict(
+        {
+            "Protocol": protocol,
+            "Cycle": cycle,
+            "Phase": phase,
+            "Time [s]": data[:, 0],
+            "Stretch [-]": data[:, 1],
+            "P [kPa]": data[:, 2],
+            "Weight [-]": 1.0 / data[:, 3],
+        }
+    )
+    df.to_csv(fout, index=False)
+
+
+def export_stage(job: Segmented) -> Path:
+    fout = job.task.file.parent / f"{job.task.fout}.csv"
+    with recording(job.task.profile), stage("export"):
+        export_bogoni_data(job.raw, job.result.segmentation, job.result.prot_map, fout=fout)
+    if job.task.profile is not None:
+        job.task.profile.dump(fout.with_name(f"{job.task.fout}_profile.json"))
+    return fout
@@ -0,0 +1,158 @@
+import dataclasses as dc
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+__all__ = ["Profile", "StageStats", "count", "recording", "stage"]
+
+
+@dc.dataclass(slots=True)
+class StageStats:
+    calls: int = 0
+    wall_s: float = 0.0
+    peak_bytes: int = 0
+
+
+@dc.dataclass(slots=True)
+class Profile:
+    """Stage timings and counters of one run.
+
+    Attributes
+    ----------
+    memory : bool
+        Whether to trace the peak allocation of each stage with tracemalloc. This slows
+        down allocation heavy code, timings alone are cheap. Peaks are process wide, so
+        they include concurrent stages running in other threads.
+    stages : dict[str, StageStats]
+        Accumulated calls, wall time and peak allocation above the stage entry.
+    counters : dict[str, int]
+        Event counts, e.g. find_peaks, candidates, sweeps, moved.
+
+    """
+
+    memory: bool = False
+    stages: dict[str, StageStats] = dc.field(default_factory=dict[str, StageStats])
+    counters: dict[str, int] = dc.field(default_factory=dict[str, int])
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "stages": {k: dc.asdict(v) for k, v in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+    def dump(self, fout: Path) -> None:
+        with fout.open("w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+# Per thread and per task, so concurrent pipeline stages record into their own profile.
+_ACTIVE: ContextVar[Profile | None] = ContextVar("pwlsplit_profile", default=None)
+
+# tracemalloc is process wide. It is started by the first recording that needs it and
+# stopped by the last one, unless it was already running before.
+_LOCK = threading.Lock()
+_TRACERS = 0
+_OWNED = False
+
+
+def _start_tracing() -> None:
+    global _TRACERS, _OWNED  # noqa: PLW0603
+    with _LOCK:
+        if _TRACERS == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _OWNED = True
+        _TRACERS += 1
+
+
+def _stop_tracing() -> None:
+    global _TRACERS, _OWNED  # noqa: PLW0603
+    with _LOCK:
+        _TRACERS -= 1
+        if _TRACERS == 0 and _OWNED:
+            tracemalloc.stop()
+            _OWNED = False
+
+
+@contextmanager
+def recording(profile: Profile | None) -> Iterator[Profile | None]:
+    """Collect stages and counters into profile for the duration of the block.
+
+    Passing None leaves instrumentation disabled, so callers can thread an optional
+    profile through without branching.
+    """
+    if profile is None:
+        yield None
+        return
+    token = _ACTIVE.set(profile)
+    if profile.memory:
+        _start_tracing()
+    try:
+        yield profile
+    finally:
+        if profile.memory:
+            _stop_tracing()
+        _ACTIVE.reset(token)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add n to a counter of the active profile, if any."""
+    if (profile := _ACTIVE.get()) is None:
+        return
+    counters = profile.counters
+    counters[name] = counters.get(name, 0) + n
+
+
+@dc.dataclass(slots=True, eq=False)
+class _Frame:
+    start: int
+    peak: int
+
+
+# Open stages of every thread. reset_peak is process wide, so before each reset the
+# peak so far is folded into all open frames, not only those of the calling thread.
+_FRAMES: set[_Frame] = set()
+
+
+def _enter_memory() -> _Frame:
+    with _LOCK:
+        current, peak = tracemalloc.get_traced_memory()
+        for f in _FRAMES:
+            f.peak = max(f.peak, peak)
+        frame = _Frame(start=current, peak=current)
+        _FRAMES.add(frame)
+        tracemalloc.reset_peak()
+    return frame
+
+
+def _exit_memory(frame: _Frame) -> int:
+    with _LOCK:
+        _FRAMES.discard(frame)
+        peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+    return max(peak - frame.start, 0)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the block as a call of the named stage of the active profile, if any."""
+    if (profile := _ACTIVE.get()) is None:
+        yield
+        return
+    frame = _enter_memory() if profile.memory and tracemalloc.is_tracing() else None
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - t0
+        stats = profile.stages.setdefault(name, StageStats())
+        stats.calls += 1
+        stats.wall_s += wall
+        if frame is not None:
+            stats.peak_bytes = max(stats.peak_bytes, _exit_memory(frame))
@@ -0,0 +1,166 @@
+import dataclasses as dc
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Mapping, Sequence
+
+    from pytools.arrays import A1, A2
+
+    from .types import Curve, Segmentation
+
+__all__ = ["PhaseAccessor", "PhaseIndex"]
+
+
+@dc.dataclass(slots=True, frozen=True)
+class PhaseIndex:
+    """Offsets table of every phase in a segmented recording.
+
+    One row per phase, ordered as in the protocol map. Rows of a cycle, and cycles of a
+    protocol, are contiguous. Phase bounds include both break points, so neighbouring
+    phases share their boundary sample.
+
+    Attributes
+    ----------
+    start : A1[np.intp]
+        First sample of each phase.
+    stop : A1[np.intp]
+        One past the last sample of each phase.
+    curve : A1[np.int8]
+        Curve code of each phase, see Curve.code.
+    position : A1[np.intp]
+        Position of each phase within its cycle.
+    protocols : Mapping[str, slice]
+        Rows belonging to each protocol.
+    cycles : Mapping[tuple[str, str], slice]
+        Rows belonging to each (protocol, cycle).
+
+    """
+
+    start: A1[np.intp]
+    stop: A1[np.intp]
+    curve: A1[np.int8]
+    position: A1[np.intp]
+    protocols: Mapping[str, slice]
+    cycles: Mapping[tuple[str, str], slice]
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    @classmethod
+    def build[F: np.floating, I: np.integer](
+        cls,
+        segmentation: Segmentation[F, I],
+        prot_map: Mapping[str, Mapping[str, Sequence[int]]],
+    ) -> PhaseIndex:
+        segs = np.array(
+            [v for prot_vals in prot_map.values() for s in prot_vals.values() for v in s],
+            dtype=np.intp,
+        )
+        if len(segmentation.idx) != segmentation.n_point:
+            msg = (
+                f"Segmentation has {len(segmentation.idx)} break point indices "
+                f"for {segmentation.n_point} break points."
+            )
+            raise ValueError(msg)
+        if len(segs) and not (segs.min() >= 1 and segs.max() < segmentation.n_point):
+            msg = f"Protocol map refers to segments outside 1..{segmentation.n_point - 1}."
+            raise ValueError(msg)
+        idx = np.asarray(segmentation.idx, dtype=np.intp)
+        protocols: dict[str, slice] = {}
+        cycles: dict[tuple[str, str], slice] = {}
+        position = np.empty(len(segs), dtype=np.intp)
+        row = 0
+        for prot, prot_vals in prot_map.items():
+            prot_start = row
+            for cycle_name, s in prot_vals.items():
+                cycles[prot, cycle_name] = slice(row, row + len(s))
+                position[row : row + len(s)] = np.arange(len(s))
+                row += len(s)
+            protocols[prot] = slice(prot_start, row)
+        return cls(
+            start=idx[segs - 1],
+            stop=idx[segs] + 1,
+            curve=np.asarray(segmentation.curves, dtype=np.int8)[segs - 1],
+            position=position,
+            protocols=protocols,
+            cycles=cycles,
+        )
+
+    def rows(
+        self,
+        protocol: str | None = None,
+        cycle: str | None = None,
+        curve: Curve | None = None,
+    ) -> A1[np.intp]:
+        """Return the rows of the phases matching all given filters."""
+        if cycle is not None and protocol is None:
+            msg = "A cycle can only be selected together with its protocol."
+            raise ValueError(msg)
+        match protocol, cycle:
+            case None, _:
+                sel = slice(0, len(self))
+            case str(), None:
+                sel = self.protocols[protocol]
+            case str(), str():
+                sel = self.cycles[protocol, cycle]
+        rows = np.arange(sel.start, sel.stop, dtype=np.intp)
+        if curve is not None:
+            rows = rows[self.curve[sel] == curve.code]
+        return rows
+
+
+@dc.dataclass(slots=True, frozen=True)
+class PhaseAccessor[F: np.floating]:
+    """Views of the raw data by protocol, cycle, phase and curve type.
+
+    Every array returned is a view into `data` along its first axis. Nothing is copied,
+    so modifying a returned array modifies `data`.
+    """
+
+    data: A2[F]
+    index: PhaseIndex
+
+    @classmethod
+    def build[I: np.integer](
+        cls,
+        data: A2[F],
+        segmentation: Segmentation[F, I],
+        prot_map: Mapping[str, Mapping[str, Sequence[int]]],
+    ) -> PhaseAccessor[F]:
+        return cls(data=data, index=PhaseIndex.build(segmentation, prot_map))
+
+    def _view(self, start: int, stop: int) -> A2[F]:
+        return self.data[start:stop]
+
+    def protocol(self, protocol: str) -> A2[F]:
+        rows = self.index.protocols[protocol]
+        return self._view(self.index.start[rows.start], self.index.stop[rows.stop - 1])
+
+    def cycle(self, protocol: str, cycle: str) -> A2[F]:
+        rows = self.index.cycles[protocol, cycle]
+        return self._view(self.index.start[rows.start], self.index.stop[rows.stop - 1])
+
+    def phase(self, protocol: str, cycle: str, position: int) -> A2[F]:
+        rows = self.index.cycles[protocol, cycle]
+        if not (0 <= position < rows.stop - rows.start):
+            msg = f"Cycle {protocol}/{cycle} has no phase {position}."
+            raise IndexError(msg)
+        row = rows.start + position
+        return self._view(self.index.start[row], self.index.stop[row])
+
+    def phases(
+        self,
+        protocol: str | None = None,
+        cycle: str | None = None,
+        curve: Curve | None = None,
+    ) -> list[A2[F]]:
+        """Return views of every phase matching all given filters, in protocol order."""
+        rows = self.index.rows(protocol, cycle, curve)
+        start, stop = self.index.start[rows].tolist(), self.index.stop[rows].tolist()
+        return [self._view(i, j) for i, j in zip(start, stop, strict=True)]
+
+    def __iter__(self) -> Iterator[A2[F]]:
+        start, stop = self.index.start.tolist(), self.index.stop.tolist()
+        return (self._view(i, j) for i, j in zip(start, stop, strict=True))
@@ -0,0 +1,194 @@
+import dataclasses as dc
+import reprlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from queue import Queue
+from typing import TYPE_CHECKING, Any, Literal
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Sequence
+
+__all__ = ["Stage", "StageError", "run_pipeline"]
+
+
+@dc.dataclass(slots=True, frozen=True)
+class Stage[T, U]:
+    """A step of a pipeline.
+
+    Attributes
+    ----------
+    name : str
+        Name used in error messages.
+    fn : Callable[[Any], Any]
+        Work done on each item, or on its payload if send is given. Must be picklable
+        for compute stages.
+    kind : Literal["io", "compute"]
+        io stages run fn in their worker threads, compute stages send it to the
+        shared process pool.
+    workers : int
+        Number of items processed concurrently by this stage.
+    depth : int
+        Capacity of the queue feeding this stage. Upstream stages block when it is
+        full, which bounds the number of items held in memory.
+    send : Callable[[T], Any] | None
+        Extract the payload passed to fn. Runs in the stage thread, so for compute
+        stages only the payload, not the whole item, is pickled to the process pool.
+    receive : Callable[[T, Any], U] | None
+        Combine the item with the result of fn into the stage output. Runs in the
+        stage thread.
+
+    """
+
+    name: str
+    fn: Callable[[Any], Any]
+    kind: Literal["io", "compute"] = "io"
+    workers: int = 1
+    depth: int = 2
+    send: Callable[[T], Any] | None = None
+    receive: Callable[[T, Any], U] | None = None
+
+
+class _Done:
+    pass
+
+
+_DONE = _Done()
+
+
+class StageError(RuntimeError):
+    def __init__(self, stage: str, label: str) -> None:
+        super().__init__(f"Stage {stage} failed on {label}.")
+
+
+@dc.dataclass(slots=True)
+class _Run:
+    pool: ProcessPoolExecutor | None
+    label: Callable[[Any], str]
+    stop: threading.Event = dc.field(default_factory=threading.Event)
+    lock: threading.Lock = dc.field(default_factory=threading.Lock)
+    errors: list[BaseException] = dc.field(default_factory=list[BaseException])
+
+    def fail(self, err: BaseException) -> None:
+        with self.lock:
+            self.errors.append(err)
+        self.stop.set()
+
+
+def _feed(run: _Run, source: Iterable[Any], outbox: Queue[Any]) -> None:
+    try:
+        for item in source:
+            if run.stop.is_set():
+                break
+            outbox.put(item)
+    except Exception as e:  # noqa: BLE001
+        run.fail(e)
+    finally:
+        outbox.put(_DONE)
+
+
+def _label(run: _Run, item: object) -> str:
+    try:
+        return run.label(item)
+    except Exception:  # noqa: BLE001
+        return reprlib.repr(item)
+
+
+def _work(
+    run: _Run,
+    stage: Stage[Any, Any],
+    inbox: Queue[Any],
+    outbox: Queue[Any],
+    remaining: list[int],
+) -> None:
+    try:
+        while not isinstance(item := inbox.get(), _Done):
+            # After a failure keep draining so that upstream stages never block on a full queue.
+            if run.stop.is_set():
+                continue
+            try:
+                payload = item if stage.send is None else stage.send(item)
+                if stage.kind == "compute" and run.pool is not None:
+                    result = run.pool.submit(stage.fn, payload).result()
+                else:
+                    result = stage.fn(payload)
+                if stage.receive is not None:
+                    result = stage.receive(item, result)
+            except Exception as e:  # noqa: BLE001
+                err = StageError(stage.name, _label(run, item))
+                err.__cause__ = e
+                run.fail(err)
+                continue
+            outbox.put(result)
+    finally:
+        # Pass the sentinel on to the sibling workers of this stage. Done even if this worker
+        # dies, otherwise run_pipeline would wait forever for the end of the output.
+        inbox.put(_DONE)
+        with run.lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            outbox.put(_DONE)
+
+
+def run_pipeline(
+    source: Iterable[Any],
+    stages: Sequence[Stage[Any, Any]],
+    *,
+    max_processes: int | None = None,
+    depth: int = 2,
+    label: Callable[[Any], str] = reprlib.repr,
+) -> list[Any]:
+    """Stream items through the stages concurrently.
+
+    Each stage pulls from a bounded queue filled by the stage before it, so loading,
+    computing and writing overlap while at most about `depth + workers` items wait at
+    each stage. Items may leave a stage with several workers out of order.
+
+    Args:
+        source: Items fed to the first stage, consumed lazily.
+        stages: Steps applied in order.
+        max_processes: Size of the process pool shared by compute stages.
+        depth: Capacity of the queue holding the output of the last stage.
+        label: Short description of an item, used in error messages.
+
+    Returns:
+        Output of the last stage for every item.
+
+    Raises:
+        StageError: If any stage fails. The remaining items are discarded.
+        ValueError: If a stage has fewer than one worker.
+
+    """
+    for s in stages:
+        if s.workers < 1:
+            msg = f"Stage {s.name} needs at least one worker, got {s.workers}."
+            raise ValueError(msg)
+    needs_pool = any(s.kind == "compute" for s in stages)
+    pool = ProcessPoolExecutor(max_workers=max_processes) if needs_pool else None
+    run = _Run(pool=pool, label=label)
+    queues: list[Queue[Any]] = [Queue(maxsize=s.depth) for s in stages]
+    queues.append(Queue(maxsize=depth))
+    threads = [threading.Thread(target=_feed, args=(run, source, queues[0]), daemon=True)]
+    for k, stage in enumerate(stages):
+        remaining = [stage.workers]
+        threads.extend(
+            threading.Thread(
+                target=_work,
+                args=(run, stage, queues[k], queues[k + 1], remaining),
+                name=f"{stage.name}-{i}",
+                daemon=True,
+            )
+            for i in range(stage.workers)
+        )
+    try:
+        for t in threads:
+            t.start()
+        results = list(iter(queues[-1].get, _DONE))
+        for t in threads:
+            t.join()
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+    if run.errors:
+        raise run.errors[0]
+    return results
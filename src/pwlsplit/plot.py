@@ -1,31 +1,105 @@
 # pyright: reportUnknownMemberType=false
-from typing import TYPE_CHECKING, Unpack
+import dataclasses as dc
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Literal, Self, Unpack
 
+import matplotlib as mpl
 import numpy as np
 from matplotlib import pyplot as plt
 from pytools.plotting.api import create_figure, style_kwargs, update_figure_setting
 
 if TYPE_CHECKING:
     from collections.abc import Sequence
+    from concurrent.futures import Future
     from pathlib import Path
+    from types import TracebackType
 
+    from pytools.arrays import A1
     from pytools.plotting.trait import PlotKwargs
 
     from ._types import PreppedData, Segmentation
 
+__all__ = [
+    "BackgroundPlotter",
+    "PlotError",
+    "PlotJob",
+    "decimate_minmax",
+    "plot_prepped_data",
+    "plot_segmentation_part",
+    "prepare_prepped_data",
+    "prepare_segmentation_part",
+]
 
-def plot_prepped_data[F: np.floating](
-    data: PreppedData[F], fout: Path, **kwargs: Unpack[PlotKwargs]
-) -> None:
-    defaults: PlotKwargs = {"figsize": (8, 6), "padleft": 0.12, "padbottom": 0.3, "linewidth": 0.75}
-    kwargs = defaults | kwargs
+type _Series = tuple[A1[np.intp], A1[np.floating]]
+
+
+def decimate_minmax[F: np.floating](y: A1[F], n_bins: int) -> A1[np.intp]:
+    """Return the indices of the min and max sample of each of n_bins equal bins of y.
+
+    Drawing only these samples is visually identical to drawing all of y at a width of
+    n_bins pixels, peaks included. Returns all indices if y is already small enough.
+    """
+    n = len(y)
+    if n <= 2 * n_bins:
+        return np.arange(n, dtype=np.intp)
+    size = -(-n // n_bins)
+    nb = n // size
+    body = y[: nb * size].reshape(nb, size)
+    offset = np.arange(0, nb * size, size, dtype=np.intp)
+    pairs = np.stack([body.argmin(axis=1) + offset, body.argmax(axis=1) + offset], axis=1)
+    if nb * size < n:
+        tail = y[nb * size :]
+        last = np.array([[tail.argmin(), tail.argmax()]], dtype=np.intp) + nb * size
+        pairs = np.concatenate([pairs, last])
+    return np.sort(pairs, axis=1).ravel()
+
+
+def _pixel_width(kwargs: PlotKwargs) -> int:
+    width, _ = kwargs.get("figsize", plt.rcParams["figure.figsize"])
+    return int(width * plt.rcParams["figure.dpi"])
+
+
+def _decimated[F: np.floating](y: A1[F], n_bins: int, start: int = 0) -> _Series:
+    idx = decimate_minmax(y, n_bins)
+    return idx + start, y[idx]
+
+
+def _prepped_series[F: np.floating](data: PreppedData[F], n_bins: int) -> list[_Series]:
+    return [
+        _decimated(data.x, n_bins),
+        _decimated(data.y, n_bins),
+        _decimated(data.dy, n_bins),
+        _decimated(data.ddy, n_bins),
+    ]
+
+
+@dc.dataclass(slots=True, frozen=True)
+class PlotJob:
+    """Decimated curves of one diagnostic figure.
+
+    A job holds a few thousand points per curve, so it can be prepared where the data
+    lives, e.g. in a worker process, and cheaply sent elsewhere to be rendered.
+    """
+
+    kind: Literal["prepped", "segmentation"]
+    series: list[_Series]
+    splits: _Series | None
+    kwargs: PlotKwargs
+
+    def render(self, fout: Path) -> None:
+        match self.kind:
+            case "prepped":
+                _render_prepped_data(self.series, fout, self.kwargs)
+            case "segmentation":
+                _render_segmentation_part(self.series, self.splits, fout, self.kwargs)
+
+
+def _render_prepped_data(series: Sequence[_Series], fout: Path, kwargs: PlotKwargs) -> None:
     fig, ax = create_figure(nrows=4, **kwargs)
     update_figure_setting(fig, **kwargs)
     ax_style = style_kwargs(**kwargs)
-    ax[0].plot(data.x, **ax_style)
-    ax[1].plot(data.y, **ax_style)
-    ax[2].plot(data.dy / data.dy.max(), **ax_style)
-    ax[3].plot(data.ddy / data.ddy.max(), **ax_style)
+    for a, (steps, values) in zip(ax, series, strict=True):
+        a.plot(steps, values, **ax_style)
     ax[0].set_ylabel("Raw Data")
     ax[1].set_ylabel("Smoothed Data")
     ax[2].set_ylabel("Derivative")
@@ -35,68 +109,198 @@ def plot_prepped_data[F: np.floating](
     plt.close(fig)
 
 
-def plot_segmentation_part[F: np.floating, I: np.integer](
+_PREPPED_DEFAULTS: PlotKwargs = {
+    "figsize": (8, 6),
+    "padleft": 0.12,
+    "padbottom": 0.3,
+    "linewidth": 0.75,
+}
+
+
+def prepare_prepped_data[F: np.floating](
+    data: PreppedData[F], **kwargs: Unpack[PlotKwargs]
+) -> PlotJob:
+    kwargs = _PREPPED_DEFAULTS | kwargs
+    return PlotJob("prepped", _prepped_series(data, _pixel_width(kwargs)), None, kwargs)
+
+
+def plot_prepped_data[F: np.floating](
+    data: PreppedData[F], fout: Path, **kwargs: Unpack[PlotKwargs]
+) -> None:
+    prepare_prepped_data(data, **kwargs).render(fout)
+
+
+def _segmentation_series[F: np.floating, I: np.integer](
     data: PreppedData[F],
     segmentation: Segmentation[F, I],
     indices: Sequence[int],
-    fout: Path,
-    **kwargs: Unpack[PlotKwargs],
-) -> None:
-    defaults: PlotKwargs = {"figsize": (8, 8), "padleft": 0.05, "padbottom": 0.3, "linewidth": 0.75}
-    kwargs = defaults | kwargs
-    fig, ax = create_figure(nrows=4, **kwargs)
-    update_figure_setting(fig, **kwargs)
-    ax_style = style_kwargs(**kwargs)
+    n_bins: int,
+) -> tuple[list[_Series], _Series]:
     segments = [min(indices) - 1, *indices]
-    start = max(segmentation.idx[min(segments)], 0)
+    start = max(int(segmentation.idx[min(segments)]), 0)
     end = (
         min(
-            segmentation.idx[min(max(segments) + 1, segmentation.n_point - 1)],
+            int(segmentation.idx[min(max(segments) + 1, segmentation.n_point - 1)]),
             data.n - 1,
         )
         + 1
     )
-    steps = np.arange(start, end, dtype=np.intp)
-    ax[0].plot(steps, data.x[start:end], "k-", label="Data", **ax_style)
-    ax[0].plot(
-        segmentation.idx[segments],
-        data.x[segmentation.idx[segments]],
-        "ro",
-        label="Splits",
-        **ax_style,
-    )
+    local_peak_scaling = abs(segmentation.peaks[min(indices)])
+    series = [
+        _decimated(data.x[start:end], n_bins, start),
+        _decimated(data.ddy[start:end] / local_peak_scaling, n_bins, start),
+        _decimated(data.dy[start:end], n_bins, start),
+        _decimated(data.y[start:end], n_bins, start),
+    ]
+    split_idx = np.asarray(segmentation.idx[segments], dtype=np.intp)
+    return series, (split_idx, data.x[split_idx])
+
+
+def _render_segmentation_part(
+    series: Sequence[_Series], splits: _Series | None, fout: Path, kwargs: PlotKwargs
+) -> None:
+    fig, ax = create_figure(nrows=4, **kwargs)
+    update_figure_setting(fig, **kwargs)
+    ax_style = style_kwargs(**kwargs)
+    for a, (steps, values) in zip(ax, series, strict=True):
+        a.plot(steps, values, "k-", label="Data", **ax_style)
+        a.set_xlabel("Time")
+    if splits is not None:
+        ax[0].plot(*splits, "ro", label="Splits", **ax_style)
     ax[0].set_ylabel("Segmentation")
-    ax[0].set_xlabel("Time")
     ax[0].set_yticks([])
-    local_peak_scaling = abs(segmentation.peaks[min(indices)])
-    ax[1].plot(
-        steps,
-        data.ddy[start:end] / local_peak_scaling,
-        "k-",
-        label="Data",
-        **ax_style,
-    )
     ax[1].set_ylabel("Peaks")
-    ax[1].set_xlabel("Time")
     ax[1].set_ylim(-1.1, 1.1)
-    ax[2].plot(
-        steps,
-        data.dy[start:end],
-        "k-",
-        label="Data",
-        **ax_style,
-    )
     ax[2].set_ylabel("Gradients")
-    ax[2].set_xlabel("Time")
-    ax[3].plot(
-        steps,
-        data.y[start:end],
-        "k-",
-        label="Data",
-        **ax_style,
-    )
     ax[3].set_ylabel("Data")
-    ax[3].set_xlabel("Time")
     fig.legend(bbox_to_anchor=(1.05, 1), loc="upper left")
     fig.savefig(fout)
     plt.close(fig)
+
+
+_SEGMENTATION_DEFAULTS: PlotKwargs = {
+    "figsize": (8, 8),
+    "padleft": 0.05,
+    "padbottom": 0.3,
+    "linewidth": 0.75,
+}
+
+
+def prepare_segmentation_part[F: np.floating, I: np.integer](
+    data: PreppedData[F],
+    segmentation: Segmentation[F, I],
+    indices: Sequence[int],
+    **kwargs: Unpack[PlotKwargs],
+) -> PlotJob:
+    kwargs = _SEGMENTATION_DEFAULTS | kwargs
+    series, splits = _segmentation_series(data, segmentation, indices, _pixel_width(kwargs))
+    return PlotJob("segmentation", series, splits, kwargs)
+
+
+def plot_segmentation_part[F: np.floating, I: np.integer](
+    data: PreppedData[F],
+    segmentation: Segmentation[F, I],
+    indices: Sequence[int],
+    fout: Path,
+    **kwargs: Unpack[PlotKwargs],
+) -> None:
+    prepare_segmentation_part(data, segmentation, indices, **kwargs).render(fout)
+
+
+class PlotError(RuntimeError):
+    def __init__(self, fout: Path, n_failed: int) -> None:
+        msg = f"Plot {fout} failed."
+        if n_failed > 1:
+            msg += f" {n_failed - 1} other plot(s) failed as well."
+        super().__init__(msg)
+
+
+def _init_worker() -> None:
+    mpl.use("Agg")
+
+
+def _render_job(job: PlotJob, fout: Path) -> None:
+    job.render(fout)
+
+
+class BackgroundPlotter:
+    """Render diagnostic plots in a process pool.
+
+    Data is decimated into a PlotJob in the calling process, so only a few thousand
+    points per curve are sent to the workers, and the snapshot is taken at submission.
+    Later changes to the data or segmentation do not affect plots already submitted.
+    """
+
+    __slots__ = ("_failures", "_futures", "_pool")
+
+    def __init__(self, max_workers: int | None = None) -> None:
+        self._pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker)
+        self._futures: list[tuple[Path, Future[None]]] = []
+        self._failures: list[tuple[Path, BaseException]] = []
+
+    def _collect(self, fout: Path, future: Future[None]) -> None:
+        if (err := future.exception()) is not None:
+            self._failures.append((fout, err))
+
+    def _track(self, fout: Path, future: Future[None]) -> Future[None]:
+        # Drop finished plots so the list stays short. Their failures are kept with the
+        # path they belong to and reported by wait.
+        pending = [(fout, future)]
+        for item in self._futures:
+            if item[1].done():
+                self._collect(*item)
+            else:
+                pending.append(item)
+        self._futures = pending
+        return future
+
+    def submit(self, job: PlotJob, fout: Path) -> Future[None]:
+        return self._track(fout, self._pool.submit(_render_job, job, fout))
+
+    def plot_prepped_data[F: np.floating](
+        self, data: PreppedData[F], fout: Path, **kwargs: Unpack[PlotKwargs]
+    ) -> Future[None]:
+        return self.submit(prepare_prepped_data(data, **kwargs), fout)
+
+    def plot_segmentation_part[F: np.floating, I: np.integer](
+        self,
+        data: PreppedData[F],
+        segmentation: Segmentation[F, I],
+        indices: Sequence[int],
+        fout: Path,
+        **kwargs: Unpack[PlotKwargs],
+    ) -> Future[None]:
+        return self.submit(prepare_segmentation_part(data, segmentation, indices, **kwargs), fout)
+
+    def wait(self) -> None:
+        """Block until every submitted plot is written.
+
+        Raises:
+            PlotError: If any plot submitted since the last wait failed. Names the first
+                failed output path and chains its error.
+
+        """
+        futures, self._futures = self._futures, []
+        for fout, f in futures:
+            self._collect(fout, f)
+        failures, self._failures = self._failures, []
+        if failures:
+            fout, err = failures[0]
+            raise PlotError(fout, len(failures)) from err
+
+    def close(self) -> None:
+        try:
+            self.wait()
+        finally:
+            self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.close()
@@ -1,11 +1,11 @@
 # Copyright (c) 2025 Will Zhang
 
-from pprint import pformat
 from typing import TYPE_CHECKING
 
 import numpy as np
 from pytools.logging import get_logger
-from pytools.progress import ProgressBar
+
+from pwlsplit.instrument import count, stage
 
 if TYPE_CHECKING:
     from pytools.arrays import A1
@@ -32,6 +32,7 @@ def _optimize_i[F: np.floating, I: np.integer](
     diff = np.zeros((2 * windows + 1, index.size), dtype=index.dtype)
     diff[:, position] = np.arange(-windows, windows + 1, dtype=index.dtype)
     pars = diff + index
+    count("candidates", len(pars))
     fit = np.array([_interp_norm(data, p) for p in pars])
     return pars[fit.argmin()]
 
@@ -46,10 +47,8 @@ def optimize[F: np.floating, I: np.integer](
 ) -> A1[I]:
     if index.size < _MINIMUM_INDEX_SIZE:
         return index
-    bart = ProgressBar(n=index.size - 2)
     for i in range(1, index.size - 1):
         index = _optimize_i(data, index, i, windows)
-        bart.next()
     return index
 
 
@@ -61,16 +60,19 @@ def opt_index[F: np.floating, I: np.integer](
     max_iter: int = 100,
 ) -> A1[I]:
     log = get_logger()
-    old_index = index.copy()
-    old_index[-1] = len(data) - 1
-    for i in range(max_iter):
-        new_index = optimize(data, old_index, window)
-        diff = np.abs(new_index - old_index)
-        log.disp(f"Iteration {i}: {diff.sum()}")
-        if np.array_equal(new_index, old_index):
-            break
-        log.debug(pformat(new_index))
-        old_index = new_index
-        window = window - 1 if window > 1 else 1
-    old_index[-1] = len(data)
+    with stage("refine"):
+        old_index = index.copy()
+        old_index[-1] = len(data) - 1
+        for i in range(max_iter):
+            new_index = optimize(data, old_index, window)
+            diff = np.abs(new_index - old_index)
+            count("sweeps")
+            count("moved", int(np.count_nonzero(diff)))
+            log.disp(f"Iteration {i}: {diff.sum()}")
+            if np.array_equal(new_index, old_index):
+                break
+            log.debug(new_index)
+            old_index = new_index
+            window = window - 1 if window > 1 else 1
+        old_index[-1] = len(data)
     return old_index
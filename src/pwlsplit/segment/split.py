@@ -4,6 +4,7 @@ import numpy as np
 from pytools.result import Err, Ok
 from scipy.signal import find_peaks
 
+from pwlsplit.instrument import count, stage
 from pwlsplit.types import Point, PreppedData, Segmentation
 
 if TYPE_CHECKING:
@@ -14,6 +15,7 @@ def _find_next_split_peakpoint[F: np.floating, I: np.integer](
     data: PreppedData[F], sequence: Segmentation[F, I], i: int
 ) -> Ok[int] | Err:
     section = data.ddy[sequence.idx[i - 1] :] / abs(sequence.peaks[i])
+    count("find_peaks")
     peaks, _ = find_peaks(np.maximum(section, 0), prominence=0.25, height=0.25)
     if len(peaks) == 0:
         msg = "No peak point found."
@@ -25,6 +27,7 @@ def _find_next_split_valleypoint[F: np.floating, I: np.integer](
     data: PreppedData[F], sequence: Segmentation[F, I], i: int
 ) -> Ok[int] | Err:
     section = data.ddy[sequence.idx[i - 1] :] / abs(sequence.peaks[i])
+    count("find_peaks")
     valleys, _ = find_peaks(np.maximum(-section, 0), prominence=0.25, height=0.25)
     if len(valleys) == 0:
         msg = "No valley point found."
@@ -35,7 +38,7 @@ def _find_next_split_valleypoint[F: np.floating, I: np.integer](
 def find_next_split_point[F: np.floating, I: np.integer](
     data: PreppedData[F], sequence: Segmentation[F, I], i: int
 ) -> Ok[int] | Err:
-    match sequence.points[i]:
+    match Point.from_code(sequence.points[i]):
         case Point.PEAK:
             return _find_next_split_peakpoint(data, sequence, i)
         case Point.VALLEY:
@@ -51,16 +54,17 @@ def adjust_segmentation[F: np.floating, I: np.integer](
     segmentation: Segmentation[F, I],
     indices: Sequence[int],
 ) -> Ok[Segmentation[F, I]] | Err:
-    for k in indices:
-        if not (0 <= k <= segmentation.n_point):
-            continue
-        match find_next_split_point(data, segmentation, k):
-            case Ok(i):
-                segmentation.idx[k:] = np.linspace(
-                    segmentation.idx[k - 1] + i,
-                    data.n - 1,
-                    len(segmentation.idx[k:]),
-                )
-            case Err(e):
-                return Err(e)
+    with stage("split"):
+        for k in indices:
+            if not (0 <= k <= segmentation.n_point):
+                continue
+            match find_next_split_point(data, segmentation, k):
+                case Ok(i):
+                    segmentation.idx[k:] = np.linspace(
+                        segmentation.idx[k - 1] + i,
+                        data.n - 1,
+                        len(segmentation.idx[k:]),
+                    )
+                case Err(e):
+                    return Err(e)
     return Ok(segmentation)
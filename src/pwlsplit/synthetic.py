@@ -0,0 +1,94 @@
+import dataclasses as dc
+from typing import TYPE_CHECKING
+
+import numpy as np
+from pytools.result import Err, Ok
+
+from .api import compile_protocol
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from pytools.arrays import A1
+
+    from .types import CompiledProtocol, SegmentDict, SegmentType
+
+__all__ = ["SyntheticData", "synthesize"]
+
+
+@dc.dataclass(slots=True, frozen=True)
+class SyntheticData:
+    """Sampled piecewise linear signal with known break points.
+
+    Attributes
+    ----------
+    t : A1[np.float64]
+        Sample times.
+    clean : A1[np.float64]
+        Noise and drift free signal.
+    x : A1[np.float64]
+        Signal with noise and drift added.
+    breakpoints : A1[np.intp]
+        Sample index of each break point, including the start and end. Len = segments + 1
+
+    """
+
+    t: A1[np.float64]
+    clean: A1[np.float64]
+    x: A1[np.float64]
+    breakpoints: A1[np.intp]
+
+
+_MINIMUM_SAMPLES = 2
+
+
+def synthesize(  # noqa: PLR0913
+    protocol: Sequence[SegmentDict] | Sequence[SegmentType] | CompiledProtocol,
+    *,
+    n: int | None = None,
+    rate: float = 100.0,
+    noise: float = 0.0,
+    drift: float = 0.0,
+    seed: int | None = None,
+) -> Ok[SyntheticData] | Err:
+    """Sample a protocol as a noisy piecewise linear signal.
+
+    Each segment changes the signal by its rate times its duration, starting from 0. By
+    default the number of samples follows from the total duration and the sampling rate.
+    Use CompiledProtocol.repeat for longer signals with features of the same width.
+
+    Args:
+        protocol: Segments of the signal.
+        n: Number of samples. Overrides rate so that the protocol spans exactly n samples.
+        rate: Sampling rate, in samples per unit of duration.
+        noise: Standard deviation of the added Gaussian white noise.
+        drift: Change of a linear baseline added over the whole signal.
+        seed: Seed of the noise generator.
+
+    Returns:
+        The sampled signal and the sample index of every break point.
+
+    """
+    match compile_protocol(protocol):
+        case Err(e):
+            return Err(e)
+        case Ok(compiled):
+            pass
+    knots_t = np.concatenate(([0.0], np.cumsum(compiled.durations)))
+    knots_x = np.concatenate(([0.0], np.cumsum(compiled.rates * compiled.durations)))
+    total = knots_t[-1]
+    if not total > 0:
+        return Err(ValueError(f"Protocol must have a positive total duration, got {total}."))
+    if n is None:
+        n = round(total * rate) + 1
+    else:
+        rate = (n - 1) / total
+    if n < _MINIMUM_SAMPLES:
+        return Err(ValueError(f"At least {_MINIMUM_SAMPLES} samples are required, got {n}."))
+    t = np.arange(n, dtype=np.float64) / rate
+    clean = np.interp(t, knots_t, knots_x)
+    x = clean + (drift / total) * t
+    if noise > 0:
+        x += noise * np.random.default_rng(seed).standard_normal(n)
+    breakpoints = np.minimum(np.rint(knots_t * rate).astype(np.intp), n - 1)
+    return Ok(SyntheticData(t=t, clean=clean, x=x, breakpoints=breakpoints))
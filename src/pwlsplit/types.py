@@ -1,7 +1,9 @@
 from ._types import (
+    CompiledProtocol,
     Curve,
     Hold,
     Point,
+    PrepBuffers,
     PreppedData,
     Recover,
     Segmentation,
@@ -11,9 +13,11 @@ from ._types import (
 )
 
 __all__ = [
+    "CompiledProtocol",
     "Curve",
     "Hold",
     "Point",
+    "PrepBuffers",
     "PreppedData",
     "Recover",
     "SegmentDict",
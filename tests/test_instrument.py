@@ -0,0 +1,108 @@
+import threading
+import tracemalloc
+from typing import TYPE_CHECKING
+
+import pytest
+
+from pwlsplit.instrument import Profile, count, recording, stage
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+_MB = 1_000_000
+
+
+@pytest.fixture
+def untraced() -> Iterator[None]:
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    yield
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def _record_in_threads(profiles: list[Profile], size: int) -> None:
+    barrier = threading.Barrier(len(profiles))
+
+    def work(profile: Profile) -> None:
+        with recording(profile), stage("outer"):
+            barrier.wait()
+            with stage("inner"):
+                buf = bytearray(size)
+                barrier.wait()
+                del buf
+            barrier.wait()
+
+    threads = [threading.Thread(target=work, args=(p,)) for p in profiles]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+@pytest.mark.usefixtures("untraced")
+def test_concurrent_recordings_stop_tracing_when_done() -> None:
+    profiles = [Profile(memory=True) for _ in range(4)]
+    _record_in_threads(profiles, 4 * _MB)
+    assert not tracemalloc.is_tracing()
+    for p in profiles:
+        assert p.stages["inner"].peak_bytes >= 2 * _MB
+        assert p.stages["outer"].peak_bytes >= p.stages["inner"].peak_bytes
+
+
+@pytest.mark.usefixtures("untraced")
+def test_first_recording_ending_keeps_tracing_for_the_others() -> None:
+    first, second = Profile(memory=True), Profile(memory=True)
+    first_in, second_in, first_out = threading.Event(), threading.Event(), threading.Event()
+
+    def run_first() -> None:
+        with recording(first):
+            first_in.set()
+            second_in.wait()
+        first_out.set()
+
+    def run_second() -> None:
+        first_in.wait()
+        with recording(second), stage("inner"):
+            second_in.set()
+            first_out.wait()
+            buf = bytearray(_MB)
+            del buf
+
+    threads = [threading.Thread(target=run_first), threading.Thread(target=run_second)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert second.stages["inner"].peak_bytes >= _MB // 2
+    assert not tracemalloc.is_tracing()
+
+
+@pytest.mark.usefixtures("untraced")
+def test_tracing_started_elsewhere_is_left_running() -> None:
+    tracemalloc.start()
+    profiles = [Profile(memory=True) for _ in range(2)]
+    _record_in_threads(profiles, _MB)
+    assert tracemalloc.is_tracing()
+    assert all(p.stages["inner"].peak_bytes >= _MB // 2 for p in profiles)
+
+
+@pytest.mark.usefixtures("untraced")
+def test_timing_only_profile_does_not_trace() -> None:
+    profile = Profile()
+    with recording(profile), stage("work"):
+        assert not tracemalloc.is_tracing()
+        count("events", 2)
+        count("events")
+    assert profile.stages["work"].calls == 1
+    assert profile.stages["work"].peak_bytes == 0
+    assert profile.counters == {"events": 3}
+
+
+def test_no_profile_records_nothing() -> None:
+    with recording(None), stage("work"):
+        count("events")
+    profile = Profile()
+    with recording(profile):
+        pass
+    assert profile.to_dict() == {"stages": {}, "counters": {}}
@@ -0,0 +1,148 @@
+import math
+import operator
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
+import pytest
+
+from pwlsplit.pipeline import Stage, StageError, run_pipeline
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+# Generous bound for runs that should finish in milliseconds. A hang fails instead of
+# blocking the suite.
+_TIMEOUT = 30.0
+
+
+def _finish(run: Callable[[], list[Any]]) -> list[Any]:
+    out: list[Any] = []
+    errors: list[BaseException] = []
+
+    def target() -> None:
+        try:
+            out.extend(run())
+        except BaseException as e:  # noqa: BLE001
+            errors.append(e)
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(_TIMEOUT)
+    assert not thread.is_alive(), "run_pipeline did not return"
+    if errors:
+        raise errors[0]
+    return out
+
+
+def _fail_on(bad: int) -> Callable[[int], int]:
+    def fn(x: int) -> int:
+        if x == bad:
+            msg = f"bad item {x}"
+            raise ValueError(msg)
+        return x
+
+    return fn
+
+
+def test_every_item_comes_out_once_with_several_workers() -> None:
+    stages: list[Stage[Any, Any]] = [
+        Stage("double", lambda x: 2 * x, workers=4, depth=1),
+        Stage("negate", operator.neg, kind="compute", workers=3, depth=1),
+        Stage("shift", lambda x: x + 1, workers=2),
+    ]
+    out = _finish(lambda: run_pipeline(range(200), stages, max_processes=2))
+    assert sorted(out) == sorted(1 - 2 * x for x in range(200))
+
+
+def test_send_and_receive_wrap_the_stage_function() -> None:
+    stage = Stage(
+        "sqrt",
+        math.sqrt,
+        kind="compute",
+        send=operator.itemgetter(1),
+        receive=lambda item, r: (item[0], r),
+    )
+    out = _finish(lambda: run_pipeline([("a", 4.0), ("b", 9.0)], [stage], max_processes=1))
+    assert sorted(out) == [("a", 2.0), ("b", 3.0)]
+
+
+@pytest.mark.parametrize("kind", ["io", "compute"])
+def test_failure_raises_stage_error(kind: str) -> None:
+    stage: Stage[Any, Any]
+    if kind == "io":
+        stage = Stage("check", _fail_on(5), workers=3, depth=1)
+    else:
+        stage = Stage("check", math.sqrt, kind="compute", workers=3, depth=1)
+    source = range(100) if kind == "io" else [1.0, -1.0, *range(100)]
+    with pytest.raises(StageError, match="Stage check failed on") as info:
+        _finish(
+            lambda: run_pipeline(
+                source, [stage, Stage("after", lambda x: x, depth=1)], max_processes=2
+            )
+        )
+    assert isinstance(info.value.__cause__, ValueError)
+
+
+def test_failure_in_a_middle_stage_drains_upstream() -> None:
+    # The source is far larger than all queues together, so upstream stages would block
+    # forever if the failed stage stopped consuming.
+    stages: list[Stage[Any, Any]] = [
+        Stage("first", lambda x: x, workers=2, depth=1),
+        Stage("check", _fail_on(0), depth=1),
+        Stage("last", lambda x: x, depth=1),
+    ]
+    with pytest.raises(StageError):
+        _finish(lambda: run_pipeline(range(10_000), stages, depth=1))
+
+
+def test_failing_label_falls_back_to_repr() -> None:
+    def label(_: object) -> str:
+        msg = "no label"
+        raise RuntimeError(msg)
+
+    with pytest.raises(StageError, match="failed on 3"):
+        _finish(lambda: run_pipeline(range(10), [Stage("check", _fail_on(3))], label=label))
+
+
+def test_label_names_the_failed_item() -> None:
+    with pytest.raises(StageError, match="failed on item-7"):
+        _finish(
+            lambda: run_pipeline(
+                range(10), [Stage("check", _fail_on(7))], label=lambda x: f"item-{x}"
+            )
+        )
+
+
+def test_source_is_throttled_by_full_queues() -> None:
+    produced = 0
+    release = threading.Event()
+
+    def source() -> Iterator[int]:
+        nonlocal produced
+        for i in range(100):
+            produced += 1
+            yield i
+
+    def blocked(x: int) -> int:
+        release.wait(_TIMEOUT)
+        return x
+
+    result: list[list[Any]] = []
+    thread = threading.Thread(
+        target=lambda: result.append(run_pipeline(source(), [Stage("slow", blocked, depth=1)])),
+        daemon=True,
+    )
+    thread.start()
+    time.sleep(0.2)
+    # One item in the worker, one in its queue and one held by the feeder.
+    assert produced <= 3
+    release.set()
+    thread.join(_TIMEOUT)
+    assert not thread.is_alive()
+    assert sorted(result[0]) == list(range(100))
+
+
+def test_stage_needs_a_worker() -> None:
+    with pytest.raises(ValueError, match="at least one worker"):
+        run_pipeline(range(3), [Stage("none", lambda x: x, workers=0)])